@@ -0,0 +1,61 @@
+"""
+Cache Helper Functions
+
+Redis helper functions for caching read-heavy API responses.
+Caching is disabled (every lookup is a miss) when REDIS_URL is not set or Redis is unreachable.
+"""
+
+import os
+from typing import Optional, Union
+from dotenv import load_dotenv
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+# Load environment variables from .env file
+load_dotenv()
+
+redis = None
+
+redis_url = os.getenv("REDIS_URL")
+
+if redis_url:
+    # Short timeouts so a blackholed Redis degrades to a cache miss instead of hanging requests
+    redis = Redis.from_url(redis_url, socket_connect_timeout=0.2, socket_timeout=0.2)
+
+DEFAULT_TTL = 30
+
+async def cache_get(key: str, field: Optional[str] = None) -> Optional[bytes]:
+    """Return the cached JSON payload for key (or a field of the hash at key), or None on a miss"""
+    if redis is None:
+        return None
+    try:
+        if field is not None:
+            return await redis.hget(key, field)
+        return await redis.get(key)
+    except RedisError:
+        return None
+
+async def cache_set(key: str, value: Union[str, bytes], ttl: int = DEFAULT_TTL, field: Optional[str] = None):
+    """Store a serialized JSON payload under key (or a field of the hash at key) for ttl seconds"""
+    if redis is None:
+        return
+    try:
+        if field is not None:
+            # NX: the first cached page starts the hash's TTL and later pages must not extend it,
+            # or earlier pages would outlive ttl. Requires Redis >= 7.0; MULTI keeps a rejected
+            # EXPIRE from leaving a hash without a TTL behind.
+            async with redis.pipeline(transaction=True) as pipe:
+                await pipe.hset(key, field, value).expire(key, ttl, nx=True).execute()
+        else:
+            await redis.setex(key, ttl, value)
+    except RedisError:
+        pass
+
+async def cache_delete(*keys: str):
+    """Invalidate cached payloads"""
+    if redis is None or not keys:
+        return
+    try:
+        await redis.delete(*keys)
+    except RedisError:
+        pass
@@ -5,11 +5,12 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
+from pymongo.errors import BulkWriteError
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -22,11 +23,19 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    # One long-lived client per process: keep warm connections around and compress wire traffic
+    _client = AsyncIOMotorClient(
+        database_url,
+        maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+        minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 10)),
+        compressors=os.getenv("MONGO_COMPRESSORS", "zstd,zlib"),
+        retryWrites=True,
+        serverSelectionTimeoutMS=3000,
+    )
     db = _client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -37,19 +46,48 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     else:
         data_dict = data.copy()
 
-    data_dict['created_at'] = datetime.now(timezone.utc)
-    data_dict['updated_at'] = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
+    data_dict['created_at'] = now
+    data_dict['updated_at'] = now
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert documents with timestamps in one unordered batch, returning (inserted ids, failures by input index)"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for data in items:
+        data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        docs.append(data_dict)
+
+    if not docs:
+        return [], []
+
+    try:
+        result = await db[collection_name].insert_many(docs, ordered=False)
+        return [str(i) for i in result.inserted_ids], []
+    except BulkWriteError as e:
+        failed = [{"index": err["index"], "errmsg": err.get("errmsg")} for err in e.details.get("writeErrors", [])]
+        failed_indexes = {f["index"] for f in failed}
+        return [str(d["_id"]) for i, d in enumerate(docs) if i not in failed_indexes], failed
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, batch_size: int = None, sort: list = None):
+    """Get documents from collection, optionally returning only the projected fields"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
     if limit:
         cursor = cursor.limit(limit)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
     
-    return list(cursor)
+    return await cursor.to_list(length=None)
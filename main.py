@@ -1,14 +1,29 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends
+import time
+import logging
+import hmac
+import asyncio
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, conlist
 from typing import List, Optional
 from bson import ObjectId
+import orjson
+from pymongo.collation import Collation
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, PyMongoError
 
-from database import db, create_document, get_documents
+from database import db, create_document, create_documents, get_documents
+from cache import cache_get, cache_set, cache_delete
 from schemas import School, Order, PayoutRequest
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Collation of the unique school email index; email lookups must use it to hit that index
+EMAIL_COLLATION = Collation(locale="en", strength=2)
+EMAIL_INDEX_NAME = "email_ci"
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,12 +33,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# (collection, keys, options) created on startup
+INDEXES = [
+    # Case-insensitive so legacy mixed-case addresses and new ones can't collide or diverge.
+    # Fails while duplicate emails exist; see README for the cleanup.
+    ("school", "email", {"unique": True, "collation": EMAIL_COLLATION, "name": EMAIL_INDEX_NAME}),
+    # Back the school_id/status filters used by the revenue aggregations
+    ("order", [("school_id", 1), ("status", 1)], {}),
+    ("payoutrequest", [("school_id", 1), ("status", 1)], {}),
+    # Back the keyset pagination of the list endpoints
+    ("order", [("school_id", 1), ("_id", 1)], {}),
+    ("payoutrequest", [("school_id", 1), ("_id", 1)], {}),
+]
+
+# Set once the unique email index exists; until then signup has to check for duplicates itself
+_email_index_ready = False
+
+@app.on_event("startup")
+async def ensure_indexes():
+    global _email_index_ready
+    # Never block startup: /test must still be able to report the database as down
+    if db is None:
+        return
+    for collection_name, keys, options in INDEXES:
+        try:
+            await db[collection_name].create_index(keys, **options)
+            if options.get("name") == EMAIL_INDEX_NAME:
+                _email_index_ready = True
+        except ConnectionFailure as e:
+            logger.error("Skipping index creation, database unreachable: %s", e)
+            return
+        except PyMongoError as e:
+            logger.error("Could not create index %s on %s: %s", keys, collection_name, e)
+
 @app.get("/")
 def read_root():
     return {"message": "School Portal Backend Running"}
 
+# (fetched_at, names) for /test, which load balancers hit as a healthcheck
+_collections_cache = (float("-inf"), [])
+COLLECTIONS_CACHE_TTL = 60
+
 @app.get("/test")
-def test_database():
+async def test_database():
+    global _collections_cache
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -39,7 +92,10 @@ def test_database():
             response["database_name"] = db.name
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                fetched_at, collections = _collections_cache
+                if time.monotonic() - fetched_at >= COLLECTIONS_CACHE_TTL:
+                    collections = await db.list_collection_names()
+                    _collections_cache = (time.monotonic(), collections)
                 response["collections"] = collections[:10]
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
@@ -62,56 +118,135 @@ class LoginResponse(BaseModel):
     email: str
 
 @app.post("/api/auth/signup", response_model=LoginResponse)
-def signup(school: School):
-    # Basic check for existing email
-    existing = db["school"].find_one({"email": school.email}) if db else None
-    if existing:
+async def signup(school: School):
+    # The unique email index rejects duplicates; fall back to a lookup if it couldn't be built
+    if db is not None and not _email_index_ready:
+        existing = await db["school"].find_one({"email": school.email}, {"_id": 1}, collation=EMAIL_COLLATION)
+        if existing:
+            raise HTTPException(status_code=400, detail="Email already registered")
+    try:
+        inserted_id = await create_document("school", school)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Email already registered")
-    inserted_id = create_document("school", school)
-    return LoginResponse(school_id=inserted_id, name=school.name, email=school.email)
+    return LoginResponse.model_construct(school_id=inserted_id, name=school.name, email=school.email)
 
 @app.post("/api/auth/login", response_model=LoginResponse)
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    doc = db["school"].find_one({"email": req.email, "password": req.password})
-    if not doc:
+    # Point lookup on the unique email index; compare the password here rather than in the filter
+    doc = await db["school"].find_one({"email": req.email}, {"_id": 1, "name": 1, "email": 1, "password": 1},
+                                      collation=EMAIL_COLLATION)
+    if not doc or not hmac.compare_digest(str(doc.get("password", "")).encode(), req.password.encode()):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return LoginResponse(school_id=str(doc.get("_id")), name=doc.get("name"), email=doc.get("email"))
+    return LoginResponse.model_construct(school_id=str(doc.get("_id")), name=doc.get("name"), email=doc.get("email"))
 
 # ---------------------------
 # Orders & Revenue
 # ---------------------------
+# Only fetch the fields the response models expose (plus _id for pagination; drops timestamps server-side)
+ORDER_PROJECTION = {field: 1 for field in Order.model_fields}
+PAYOUT_PROJECTION = {field: 1 for field in PayoutRequest.model_fields}
+# Cursor batch size for list endpoints, so large histories arrive in bounded chunks
+LIST_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BULK_ORDERS = 1000
+
+async def get_page(collection_name: str, school_id: str, limit: int, after_id: Optional[str], projection: dict):
+    """Fetch one keyset page of a school's documents, returning (docs, next_id)"""
+    filter_dict = {"school_id": school_id}
+    if after_id is not None:
+        if not ObjectId.is_valid(after_id):
+            raise HTTPException(status_code=400, detail="Invalid after_id")
+        filter_dict["_id"] = {"$gt": ObjectId(after_id)}
+    docs = await get_documents(collection_name, filter_dict, limit=limit, projection=projection,
+                               batch_size=LIST_BATCH_SIZE, sort=[("_id", 1)])
+    next_id = str(docs[-1]["_id"]) if len(docs) == limit else None
+    for d in docs:
+        del d["_id"]
+    return docs, next_id
+
+class OrderPage(BaseModel):
+    items: List[Order]
+    next: Optional[str] = None
+
+
+# Static revenue pipeline stages, built once; only the $match stage depends on the request
+PAID_ORDER_STATUS = "paid"
+SETTLED_PAYOUT_STATUSES = {"$in": ["approved", "paid"]}
+PROJECT_AMOUNT_STAGE = {"$project": {"_id": 0, "amount": 1}}
+ORDER_TOTALS_STAGE = {"$group": {"_id": None, "total": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+PAYOUT_TOTALS_STAGE = {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+
 class RevenueSummary(BaseModel):
     total_orders: int
     total_revenue: float
     pending_payout: float
 
-@app.get("/api/orders", response_model=List[Order])
-def list_orders(school_id: str):
+# List endpoints return projected documents as-is; the page models only document the response schema
+@app.get("/api/orders", response_model=None, responses={200: {"model": OrderPage}})
+async def list_orders(school_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), after_id: Optional[str] = None):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    docs = get_documents("order", {"school_id": school_id})
-    # Convert ObjectId fields
-    return [Order(**{**{k: v for k, v in d.items() if k != "_id"}}) for d in docs]
+    # All pages of a school live in one hash so a write invalidates them together
+    key, field = f"orders:{school_id}", f"{limit}:{after_id or ''}"
+    cached = await cache_get(key, field=field)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    docs, next_id = await get_page("order", school_id, limit, after_id, ORDER_PROJECTION)
+    page = {"items": docs, "next": next_id}
+    await cache_set(key, orjson.dumps(page), field=field)
+    return page
 
 @app.post("/api/orders")
-def create_order(order: Order):
-    inserted_id = create_document("order", order)
+async def create_order(order: Order):
+    inserted_id = await create_document("order", order)
+    await cache_delete(f"revenue:{order.school_id}", f"orders:{order.school_id}")
     return {"id": inserted_id}
 
+@app.post("/api/orders/bulk")
+async def create_orders_bulk(orders: conlist(Order, max_length=MAX_BULK_ORDERS)):
+    # Unordered insert: order is not preserved and failed documents don't stop the batch
+    inserted_ids, failed = await create_documents("order", orders)
+    school_ids = {o.school_id for o in orders}
+    await cache_delete(*[f"revenue:{sid}" for sid in school_ids], *[f"orders:{sid}" for sid in school_ids])
+    if failed:
+        # Partial success: report which input positions were rejected
+        return ORJSONResponse(status_code=207, content={"ids": inserted_ids, "failed": failed})
+    return {"ids": inserted_ids, "failed": []}
+
 @app.get("/api/revenue", response_model=RevenueSummary)
-def revenue(school_id: str):
+async def revenue(school_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    orders = list(db["order"].find({"school_id": school_id, "status": "paid"}))
-    total_revenue = float(sum([o.get("amount", 0) for o in orders]))
-    total_orders = len(orders)
-    # Pending payout = total revenue - sum of approved/paid payouts for this school
-    payouts = list(db["payoutrequest"].find({"school_id": school_id, "status": {"$in": ["approved", "paid"]}}))
-    paid_out = float(sum([p.get("amount", 0) for p in payouts]))
+    key = f"revenue:{school_id}"
+    cached = await cache_get(key)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    # Both totals are independent, so run the aggregations concurrently
+    orders, payouts = await asyncio.gather(
+        db["order"].aggregate([
+            {"$match": {"school_id": school_id, "status": PAID_ORDER_STATUS}},
+            PROJECT_AMOUNT_STAGE,
+            ORDER_TOTALS_STAGE,
+        ]).to_list(1),
+        # Pending payout = total revenue - sum of approved/paid payouts for this school
+        db["payoutrequest"].aggregate([
+            {"$match": {"school_id": school_id, "status": SETTLED_PAYOUT_STATUSES}},
+            PROJECT_AMOUNT_STAGE,
+            PAYOUT_TOTALS_STAGE,
+        ]).to_list(1),
+    )
+    orders = orders[0] if orders else {}
+    payouts = payouts[0] if payouts else {}
+    total_revenue = float(orders.get("total", 0))
+    total_orders = int(orders.get("count", 0))
+    paid_out = float(payouts.get("total", 0))
     pending = max(total_revenue - paid_out, 0.0)
-    return RevenueSummary(total_orders=total_orders, total_revenue=total_revenue, pending_payout=pending)
+    summary = RevenueSummary.model_construct(total_orders=total_orders, total_revenue=total_revenue, pending_payout=pending)
+    await cache_set(key, summary.model_dump_json())
+    return summary
 
 # ---------------------------
 # Payouts
@@ -120,28 +255,36 @@ class PayoutCreateResponse(BaseModel):
     request_id: str
     status: str
 
-@app.get("/api/payouts", response_model=List[PayoutRequest])
-def list_payouts(school_id: str):
+class PayoutPage(BaseModel):
+    items: List[PayoutRequest]
+    next: Optional[str] = None
+
+@app.get("/api/payouts", response_model=None, responses={200: {"model": PayoutPage}})
+async def list_payouts(school_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), after_id: Optional[str] = None):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    docs = get_documents("payoutrequest", {"school_id": school_id})
-    return [PayoutRequest(**{**{k: v for k, v in d.items() if k != "_id"}}) for d in docs]
+    docs, next_id = await get_page("payoutrequest", school_id, limit, after_id, PAYOUT_PROJECTION)
+    return {"items": docs, "next": next_id}
 
 @app.post("/api/payouts", response_model=PayoutCreateResponse)
-def create_payout(req: PayoutRequest):
+async def create_payout(req: PayoutRequest):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    # Ensure school exists
-    school = db["school"].find_one({"_id": ObjectId(req.school_id)}) if ObjectId.is_valid(req.school_id) else None
-    if not school:
-        # Fallback: also allow if there's at least an email match (looser for demo)
-        school = db["school"].find_one({"_id": req.school_id})
+    # Ensure school exists: match either the ObjectId or raw string id form in one query,
+    # projecting only _id since we just need existence
+    ids = [ObjectId(req.school_id), req.school_id] if ObjectId.is_valid(req.school_id) else [req.school_id]
+    school = await db["school"].find_one({"_id": {"$in": ids}}, {"_id": 1})
     if not school:
         raise HTTPException(status_code=404, detail="School not found")
-    request_id = create_document("payoutrequest", req)
-    return PayoutCreateResponse(request_id=request_id, status="pending")
+    request_id = await create_document("payoutrequest", req)
+    await cache_delete(f"revenue:{req.school_id}")
+    return PayoutCreateResponse.model_construct(request_id=request_id, status="pending")
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Each worker holds its own Mongo pool (MONGO_MIN/MAX_POOL_SIZE), so keep the default small;
+    # the connection budget is workers x pool size
+    workers = int(os.getenv("WEB_CONCURRENCY", 2))
+    # Multiple workers need an import string rather than the app object
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, loop="uvloop", http="httptools")
@@ -11,7 +11,8 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field, EmailStr
+import re
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
 
 # Example schemas (you can keep using these or the new ones below)
@@ -42,14 +43,23 @@ class Product(BaseModel):
 # School Portal Schemas
 # --------------------------------------------------
 
+_EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
 class School(BaseModel):
     """Schools collection schema (collection name: "school")"""
     name: str = Field(..., description="School name")
-    email: EmailStr = Field(..., description="School admin email")
+    email: str = Field(..., description="School admin email")
     password: str = Field(..., min_length=6, description="Password (plain for demo)")
     address: Optional[str] = Field(None, description="Address")
     phone: Optional[str] = Field(None, description="Phone number")
 
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, v: str) -> str:
+        if not _EMAIL_RE.fullmatch(v):
+            raise ValueError("value is not a valid email address")
+        return v
+
 class Order(BaseModel):
     """Uniform orders for a school (collection name: "order")"""
     school_id: str = Field(..., description="ID of the school (stringified ObjectId)")